@@ -1,38 +1,82 @@
 import os
 import re
 import logging
+import logging.handlers
+import queue
 import redis
-import smtplib
+from redis.backoff import ExponentialBackoff
+from redis.asyncio.retry import Retry
+import aiosmtplib
+import asyncio
 import bcrypt
+import hmac
+import orjson
+import jinja2
 import time
+from contextlib import asynccontextmanager
 from datetime import datetime
-from fastapi import FastAPI, Request, Form, HTTPException, Depends, status
-from fastapi.responses import HTMLResponse, RedirectResponse
+from functools import lru_cache
+from email.message import EmailMessage
+from email_validator import EmailNotValidError, validate_email as _validate_email_syntax
+from fastapi import BackgroundTasks, FastAPI, Request, Form, HTTPException, Depends, status
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from pydantic import EmailStr, BaseModel, ValidationError
+from pydantic import EmailStr, BaseModel
 from typing import Optional
-from starlette.middleware.sessions import SessionMiddleware
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("logs.txt"),
-        logging.StreamHandler()
-    ]
-)
+from redis import asyncio as aioredis
+from starsessions import SessionAutoloadMiddleware, SessionMiddleware, regenerate_session_id
+from starsessions.stores.redis import RedisStore
+from starlette.concurrency import run_in_threadpool
+
+LOG_FILE = "logs.txt"
+# Only the end of the log is rendered on /logs; /logs/download serves the whole file
+LOG_TAIL_BYTES = 256 * 1024
+
+# Configure logging: handlers enqueue records and a listener thread does the file/console I/O
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+file_handler = logging.handlers.RotatingFileHandler(LOG_FILE, maxBytes=10_000_000, backupCount=5)
+file_handler.setFormatter(log_formatter)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(log_formatter)
+
+log_queue = queue.Queue(-1)
+# Records are formatted only by the listener's handlers, so the queue side passes the bare message
+logging.basicConfig(level=logging.INFO, format="%(message)s", handlers=[logging.handlers.QueueHandler(log_queue)])
+log_listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler)
+log_listener.start()
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
-app.add_middleware(
-    SessionMiddleware,
-    secret_key=os.getenv("SESSION_SECRET", "supersecretkey"),
-    session_cookie="admin_session"
-)
-app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+app = FastAPI(default_response_class=ORJSONResponse)
+# Fingerprinted asset names such as style.3f9a1c2b.css never change content
+HASHED_ASSET_RE = re.compile(r"\.[0-9a-f]{8,}\.[A-Za-z0-9]+$")
+
+class CachedStaticFiles(StaticFiles):
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if HASHED_ASSET_RE.search(os.path.basename(full_path)):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
+
+# Templates are only re-checked on disk in development
+DEV_MODE = os.getenv("ENV") == "dev"
+JINJA_CACHE_DIR = ".jinja_cache"
+os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+templates = Jinja2Templates(env=jinja2.Environment(
+    loader=jinja2.FileSystemLoader("templates"),
+    autoescape=True,
+    auto_reload=DEV_MODE,
+    cache_size=400,
+    bytecode_cache=jinja2.FileSystemBytecodeCache(JINJA_CACHE_DIR)
+))
+
+def _render_page(name: str, error: Optional[str] = None) -> bytes:
+    # These templates only depend on the error message, so the output can be reused
+    return templates.get_template(name).render(error=error).encode("utf-8")
+
+render_page = _render_page if DEV_MODE else lru_cache(maxsize=64)(_render_page)
 
 # Configuration from environment variables
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
@@ -43,105 +87,377 @@ SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.example.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
 SMTP_USER = os.getenv("SMTP_USER", "user@example.com")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "smtppassword")
+ADMIN_BCRYPT_MS = float(os.getenv("ADMIN_BCRYPT_MS", 100))
+# Mark the session cookie Secure; enable when served over HTTPS (e.g. behind a TLS proxy)
+SESSION_HTTPS_ONLY = os.getenv("SESSION_HTTPS_ONLY", "false").lower() in ("1", "true", "yes")
 
 # Redis connection pool with password
-redis_pool = redis.ConnectionPool.from_url(
+redis_pool = aioredis.ConnectionPool.from_url(
     REDIS_URL,
     password=REDIS_PASSWORD,
     decode_responses=True,
-    ssl=True
+    ssl=True,
+    # Keep total (pool size x workers) below the server's maxclients
+    max_connections=int(os.getenv("REDIS_POOL", 32)),
+    socket_keepalive=True,
+    socket_timeout=2,
+    socket_connect_timeout=2,
+    health_check_interval=30,
+    retry_on_timeout=True,
+    retry=Retry(ExponentialBackoff(), 3),
+    retry_on_error=[redis.ConnectionError]
+)
+redis_conn = aioredis.Redis(connection_pool=redis_pool)
+
+# Sessions are only loaded for admin routes, so other requests never touch the store
+app.add_middleware(SessionAutoloadMiddleware, paths=["/admin", "/logs"])
+app.add_middleware(
+    SessionMiddleware,
+    # Sessions live server-side in Redis; the cookie only carries a random session id
+    store=RedisStore(connection=redis_conn, prefix="session:"),
+    lifetime=3600,
+    cookie_name="admin_session",
+    cookie_https_only=SESSION_HTTPS_ONLY
 )
-redis_conn = redis.Redis(connection_pool=redis_pool)
+
+# Atomically reject duplicate emails, create the user and add it to users:index; returns -1 if already registered
+REGISTER_USER_SCRIPT = redis_conn.register_script("""
+if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 1 then
+    return -1
+end
+local id = redis.call('INCR', KEYS[2])
+redis.call('HSET', 'user:' .. id, 'name', ARGV[2], 'email', ARGV[1], 'id', id)
+redis.call('HSET', KEYS[1], ARGV[1], id)
+redis.call('HSET', KEYS[3], id, cjson.encode({name = ARGV[2], email = ARGV[1]}))
+return id
+""")
 
 class UserRegistration(BaseModel):
     name: str
     email: EmailStr
 
-def get_redis_with_retry(max_retries=3, delay=1):
-    retries = 0
-    while retries < max_retries:
-        try:
-            if redis_conn.ping():
-                return redis_conn
-        except (redis.ConnectionError, redis.AuthenticationError) as e:
-            retries += 1
-            logger.warning(f"Redis connection attempt {retries} failed: {str(e)}")
-            if retries < max_retries:
-                time.sleep(delay)
-    raise redis.ConnectionError("Max retries reached. Could not connect to Redis.")
-
-def get_redis():
-    try:
-        yield get_redis_with_retry()
-    except redis.AuthenticationError:
+async def get_redis():
+    # Pool connections are health-checked and retried; no per-request PING
+    yield redis_conn
+
+@app.exception_handler(redis.RedisError)
+async def redis_exception_handler(request: Request, exc: redis.RedisError):
+    if isinstance(exc, redis.AuthenticationError):
         logger.error("Redis authentication failed. Please check password.")
-        raise HTTPException(
-            status_code=500,
-            detail="Database authentication failed. Please check Redis credentials."
-        )
-    except redis.ConnectionError as e:
-        logger.error(f"Redis connection error: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail="Database connection failed. Please check Redis credentials."
-        )
-    except redis.RedisError as e:
-        logger.error(f"Redis error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Database operation failed")
+        detail = "Database authentication failed. Please check Redis credentials."
+    elif isinstance(exc, redis.ConnectionError):
+        logger.error(f"Redis connection error: {str(exc)}")
+        detail = "Database connection failed. Please check Redis credentials."
+    else:
+        logger.error(f"Redis error: {str(exc)}")
+        detail = "Database operation failed"
+    return ORJSONResponse(status_code=500, content={"detail": detail})
+
+EMAIL_RE = re.compile(r"^[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}$", re.IGNORECASE)
+
+# RFC 5321 limit on the length of an address
+EMAIL_MAX_LENGTH = 254
 
 def validate_email(email: str) -> bool:
+    # Length check keeps unbounded form input out of the cache keys
+    if len(email) > EMAIL_MAX_LENGTH:
+        return False
+    return _validate_email_cached(email)
+
+@lru_cache(maxsize=4096)
+def _validate_email_cached(email: str) -> bool:
+    # Cheap regex reject first; full syntax check without DNS deliverability lookups
+    if EMAIL_RE.fullmatch(email) is None:
+        return False
     try:
-        EmailStr.validate(email)
+        _validate_email_syntax(email, check_deliverability=False)
         return True
-    except ValidationError:
+    except EmailNotValidError:
         return False
 
-async def send_email(to: str, subject: str, body: str) -> None:
+# Recipients per SMTP DATA transaction when the same body goes to everyone
+SMTP_BCC_BATCH = 50
+SMTP_MAX_RETRIES = int(os.getenv("SMTP_MAX_RETRIES", 3))
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 8))
+# Upper bound on the reconnect backoff, and how long sends are refused after an auth failure
+SMTP_CIRCUIT_COOLDOWN = float(os.getenv("SMTP_CIRCUIT_COOLDOWN", 60))
+
+class SMTPUnavailableError(Exception):
+    def __init__(self, message: str, retry_at: float, retryable: bool):
+        super().__init__(message)
+        self.retry_at = retry_at
+        self.retryable = retryable
+
+class SMTPPool:
+    """Bounded pool of authenticated SMTP clients, opened lazily and reused across sends."""
+
+    def __init__(self, size: int):
+        self._idle = asyncio.Queue()
+        self._slots = asyncio.Semaphore(size)
+        self._circuit_open_until = 0.0
+        self._circuit_retryable = True
+        self._connect_failures = 0
+
+    def _open_circuit(self, delay: float, retryable: bool) -> SMTPUnavailableError:
+        self._circuit_open_until = time.monotonic() + delay
+        self._circuit_retryable = retryable
+        return SMTPUnavailableError("SMTP server unavailable", self._circuit_open_until, retryable)
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        # While the circuit is open, fail without another connect+AUTH attempt
+        if time.monotonic() < self._circuit_open_until:
+            raise SMTPUnavailableError(
+                "SMTP server unavailable, not reconnecting yet",
+                self._circuit_open_until,
+                self._circuit_retryable
+            )
+        # Port 465 is implicit TLS; other ports upgrade with STARTTLS
+        implicit_tls = SMTP_PORT == 465
+        client = aiosmtplib.SMTP(hostname=SMTP_SERVER, port=SMTP_PORT, use_tls=implicit_tls, start_tls=False)
+        try:
+            await client.connect()
+            try:
+                if not implicit_tls:
+                    await client.starttls()
+                await client.login(SMTP_USER, SMTP_PASSWORD)
+            except BaseException:
+                client.close()
+                raise
+        except aiosmtplib.SMTPAuthenticationError as e:
+            # Retrying bad credentials only risks locking the account
+            logger.error(f"SMTP login failed, refusing sends for {SMTP_CIRCUIT_COOLDOWN:g}s: {str(e)}")
+            raise self._open_circuit(SMTP_CIRCUIT_COOLDOWN, retryable=False) from e
+        except (aiosmtplib.SMTPException, OSError) as e:
+            # Concurrent attempts failing on the same outage count once toward the backoff
+            if time.monotonic() >= self._circuit_open_until:
+                self._connect_failures += 1
+            delay = min(2 ** self._connect_failures, SMTP_CIRCUIT_COOLDOWN)
+            logger.warning(f"SMTP connection failed, reconnecting in {delay:g}s: {str(e)}")
+            raise self._open_circuit(delay, retryable=True) from e
+        # The server is reachable again; let other sends reconnect right away
+        self._connect_failures = 0
+        if self._circuit_retryable:
+            self._circuit_open_until = 0.0
+        return client
+
+    @asynccontextmanager
+    async def connection(self):
+        async with self._slots:
+            client = None
+            while client is None and not self._idle.empty():
+                idle = self._idle.get_nowait()
+                if idle.is_connected:
+                    client = idle
+            if client is None:
+                client = await self._connect()
+            try:
+                yield client
+            except aiosmtplib.SMTPResponseException:
+                # A rejected transaction leaves the session usable once reset
+                try:
+                    await client.rset()
+                except (aiosmtplib.SMTPException, OSError):
+                    client.close()
+                else:
+                    self._idle.put_nowait(client)
+                raise
+            except BaseException:
+                # Don't hand out a connection left in an unknown state
+                client.close()
+                raise
+            self._idle.put_nowait(client)
+
+    async def close(self) -> None:
+        while not self._idle.empty():
+            client = self._idle.get_nowait()
+            try:
+                await client.quit()
+            except aiosmtplib.SMTPException:
+                client.close()
+
+smtp_pool = SMTPPool(SMTP_POOL_SIZE)
+
+async def send_email(msg: EmailMessage, recipients: list) -> bool:
+    for attempt in range(SMTP_MAX_RETRIES + 1):
+        try:
+            async with smtp_pool.connection() as smtp:
+                try:
+                    await smtp.send_message(msg, recipients=recipients)
+                except aiosmtplib.SMTPRecipientsRefused as e:
+                    logger.warning(f"Recipients refused: {', '.join(r.recipient for r in e.recipients)}")
+            return True
+        except SMTPUnavailableError as e:
+            if not e.retryable:
+                return False
+            # Wait for the pool's reconnect backoff instead of adding our own attempts
+            delay = max(e.retry_at - time.monotonic(), 0)
+        except OSError as e:
+            # Disconnects and timeouts; the broken client was discarded by the pool
+            logger.warning(f"Email sending attempt {attempt + 1} failed: {str(e)}")
+            delay = 2 ** (attempt + 1)
+        except aiosmtplib.SMTPResponseException as e:
+            if not 400 <= e.code < 500:
+                logger.error(f"Email rejected by SMTP server: {str(e)}")
+                return False
+            logger.warning(f"Email sending attempt {attempt + 1} deferred: {str(e)}")
+            delay = 2 ** (attempt + 1)
+        except aiosmtplib.SMTPException as e:
+            logger.error(f"Email sending failed: {str(e)}")
+            return False
+        if attempt < SMTP_MAX_RETRIES:
+            await asyncio.sleep(delay)
+    return False
+
+def build_message(subject: str, body: str, to: Optional[str] = None) -> EmailMessage:
     msg = EmailMessage()
     msg["Subject"] = subject
     msg["From"] = SMTP_USER
-    msg["To"] = to
+    if to:
+        msg["To"] = to
     msg.set_content(body)
-    
-    try:
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.send_message(msg)
-        logger.info(f"Email sent to {to}")
-    except smtplib.SMTPException as e:
-        logger.error(f"Email sending failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Email sending failed: {str(e)}")
-
-def initialize_admin_account(db: redis.Redis):
-    if not db.exists("admin:account"):
-        hashed_pw = bcrypt.hashpw(ADMIN_PASSWORD.encode('utf-8'), bcrypt.gensalt())
-        db.hset("admin:account", mapping={
-            "username": ADMIN_USERNAME,
-            "password": hashed_pw
-        })
+    return msg
+
+def iter_broadcast_messages(subject: str, message: str, names: list, emails: list):
+    # Built lazily so only the messages currently being sent are held in memory
+    if "{{Student_name}}" in message:
+        # Escape literal braces, then turn the placeholder into a format field
+        template = message.replace("{", "{{").replace("}", "}}").replace("{{{{Student_name}}}}", "{Student_name}")
+        for name, email in zip(names, emails):
+            yield build_message(subject, template.format_map({"Student_name": name}), email), [email]
+    else:
+        # Identical body for everyone: send Bcc batches instead of one DATA per user
+        msg = build_message(subject, message)
+        for i in range(0, len(emails), SMTP_BCC_BATCH):
+            yield msg, emails[i:i + SMTP_BCC_BATCH]
+
+async def deliver_broadcast(subject: str, message: str, names: list, emails: list) -> None:
+    messages = iter_broadcast_messages(subject, message, names, emails)
+    results = {True: 0, False: 0}
+
+    async def worker():
+        # Workers share the generator; each pulls the next message once its previous send finishes
+        for msg, recipients in messages:
+            results[await send_email(msg, recipients)] += 1
+
+    await asyncio.gather(*(worker() for _ in range(SMTP_POOL_SIZE)))
+    total = results[True] + results[False]
+    if results[False]:
+        logger.error(f"Broadcast incomplete, {results[False]} of {total} messages not sent")
+    else:
+        logger.info(f"Broadcast delivered in {total} messages")
+
+async def initialize_admin_account(db: aioredis.Redis):
+    # HSETNX leaves an existing account untouched, so no EXISTS round-trip is needed
+    hashed_pw = bcrypt.hashpw(ADMIN_PASSWORD.encode('utf-8'), bcrypt.gensalt(BCRYPT_ROUNDS))
+    async with db.pipeline() as pipe:
+        pipe.hsetnx("admin:account", "username", ADMIN_USERNAME)
+        pipe.hsetnx("admin:account", "password", hashed_pw)
+        created = await pipe.execute()
+    if any(created):
         logger.info("Admin account initialized")
 
-def verify_admin(username: str, password: str, db: redis.Redis) -> bool:
-    admin_data = db.hgetall("admin:account")
-    if not admin_data:
-        return False
-        
+async def backfill_user_index(db: aioredis.Redis):
+    # Users registered before users:index existed are indexed once, on first start
+    if await db.exists("users:index") or not await db.exists("users:count"):
+        return
+    keys = [key async for key in db.scan_iter(match="user:*", count=1000)]
+    async with db.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.hgetall(key)
+        users = await pipe.execute()
+    index = {
+        user["id"]: orjson.dumps({"name": user.get("name", ""), "email": user["email"]}).decode()
+        for user in users if user
+    }
+    if index:
+        await db.hset("users:index", mapping=index)
+        logger.info(f"Indexed {len(index)} existing users")
+
+def calibrate_bcrypt_rounds(target_ms: float, min_rounds: int = 10) -> int:
+    # Each extra round doubles the cost; stop before exceeding the target
+    rounds = min_rounds
+    while rounds < 31:
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds + 1))
+        if (time.perf_counter() - start) * 1000 > target_ms:
+            break
+        rounds += 1
+    return rounds
+
+def parse_bcrypt_rounds(value) -> int:
+    try:
+        rounds = int(value)
+    except (TypeError, ValueError):
+        rounds = None
+    if rounds is None or not 4 <= rounds <= 31:
+        raise RuntimeError(f"bcrypt cost must be an integer between 4 and 31, got {value!r}")
+    return rounds
+
+# Set BCRYPT_ROUNDS to pin the cost; otherwise it is calibrated once and stored in Redis
+PINNED_BCRYPT_ROUNDS = os.getenv("BCRYPT_ROUNDS")
+if PINNED_BCRYPT_ROUNDS:
+    parse_bcrypt_rounds(PINNED_BCRYPT_ROUNDS)
+
+# Resolved at startup by load_bcrypt_rounds so every worker hashes at the same cost
+BCRYPT_ROUNDS: Optional[int] = None
+
+async def load_bcrypt_rounds(db: aioredis.Redis) -> int:
+    if PINNED_BCRYPT_ROUNDS:
+        rounds = parse_bcrypt_rounds(PINNED_BCRYPT_ROUNDS)
+        await db.hset("admin:account", "bcrypt_rounds", rounds)
+        return rounds
+
+    stored = await db.hget("admin:account", "bcrypt_rounds")
+    if stored is None:
+        # First start: calibrate once; concurrent workers all adopt whichever value lands first
+        calibrated = await run_in_threadpool(calibrate_bcrypt_rounds, ADMIN_BCRYPT_MS)
+        async with db.pipeline() as pipe:
+            pipe.hsetnx("admin:account", "bcrypt_rounds", calibrated)
+            pipe.hget("admin:account", "bcrypt_rounds")
+            stored = (await pipe.execute())[1]
+    return parse_bcrypt_rounds(stored)
+
+def bcrypt_cost(hashed: str) -> Optional[int]:
+    # Hashes look like $2b$12$<salt+hash>
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+# Checked when no admin hash is stored so a failed login costs the same bcrypt work; set at startup
+_DUMMY_HASH: Optional[bytes] = None
+
+async def verify_admin(username: str, password: str, db: aioredis.Redis) -> bool:
+    admin_data = await db.hgetall("admin:account")
     stored_user = admin_data.get("username", "")
     stored_pw = admin_data.get("password", "")
-    
-    if username != stored_user:
+
+    user_ok = hmac.compare_digest(username.encode('utf-8'), stored_user.encode('utf-8'))
+    # bcrypt is CPU-bound; keep it off the event loop
+    pw_ok = await run_in_threadpool(
+        bcrypt.checkpw, password.encode('utf-8'), stored_pw.encode('utf-8') or _DUMMY_HASH
+    )
+
+    if not (bool(admin_data) & user_ok & pw_ok):
         return False
-    
-    return bcrypt.checkpw(password.encode('utf-8'), stored_pw.encode('utf-8'))
+
+    # Existing accounts keep the cost they were created with; move them to the calibrated one
+    if bcrypt_cost(stored_pw) != BCRYPT_ROUNDS:
+        rehashed = await run_in_threadpool(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(BCRYPT_ROUNDS))
+        await db.hset("admin:account", "password", rehashed)
+        logger.info(f"Admin password rehashed with bcrypt cost {BCRYPT_ROUNDS}")
+    return True
 
 @app.on_event("startup")
 async def startup_event():
+    global BCRYPT_ROUNDS, _DUMMY_HASH
     try:
-        # Test Redis connection
-        if not redis_conn.ping():
-            raise redis.ConnectionError("Redis connection failed")
-        initialize_admin_account(redis_conn)
+        # Doubles as the connection check
+        BCRYPT_ROUNDS = await load_bcrypt_rounds(redis_conn)
+        _DUMMY_HASH = bcrypt.hashpw(b"dummy-password", bcrypt.gensalt(BCRYPT_ROUNDS))
+        logger.info(f"Using bcrypt cost {BCRYPT_ROUNDS}")
+        await initialize_admin_account(redis_conn)
+        await backfill_user_index(redis_conn)
         logger.info("Redis connection established successfully")
     except redis.AuthenticationError:
         logger.error("Redis authentication failed. Please check password.")
@@ -150,107 +466,88 @@ async def startup_event():
         logger.error(f"Redis connection failed: {str(e)}")
         raise RuntimeError("Redis connection failed")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await smtp_pool.close()
+    await redis_pool.disconnect()
+    # Flush queued log records before exit
+    log_listener.stop()
+
 @app.get("/", response_class=HTMLResponse)
 async def registration_form(request: Request):
-    return templates.TemplateResponse("register.html", {"request": request})
+    return HTMLResponse(render_page("register.html"))
 
 @app.post("/")
 async def register_user(
     request: Request,
     name: str = Form(...),
     email: str = Form(...),
-    db: redis.Redis = Depends(get_redis)
+    db: aioredis.Redis = Depends(get_redis)
 ):
-    try:
-        if not validate_email(email):
-            return templates.TemplateResponse("register.html", {
-                "request": request,
-                "error": "Invalid email format"
-            }, status_code=400)
-
-        if db.hexists("users:emails", email):
-            return templates.TemplateResponse("register.html", {
-                "request": request,
-                "error": "Email already registered"
-            }, status_code=400)
-
-        user_id = db.incr("users:count")
-        user_key = f"user:{user_id}"
-        db.hset(user_key, mapping={
-            "name": name.strip(),
-            "email": email.lower().strip(),
-            "id": user_id
-        })
-        db.hset("users:emails", email.lower().strip(), user_id)
-        logger.info(f"New user registered: {email}")
-        return RedirectResponse(url="/success", status_code=303)
-    except redis.RedisError as e:
-        logger.error(f"Registration error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Database operation failed")
+    if not validate_email(email):
+        return HTMLResponse(render_page("register.html", "Invalid email format"), status_code=400)
+
+    user_id = await REGISTER_USER_SCRIPT(
+        keys=["users:emails", "users:count", "users:index"],
+        args=[email.lower().strip(), name.strip()],
+        client=db
+    )
+    if user_id == -1:
+        return HTMLResponse(render_page("register.html", "Email already registered"), status_code=400)
+
+    logger.info(f"New user registered: {email}")
+    return RedirectResponse(url="/success", status_code=303)
 
 @app.get("/admin/login", response_class=HTMLResponse)
 async def admin_login_form(request: Request):
-    return templates.TemplateResponse("admin_login.html", {"request": request})
+    return HTMLResponse(render_page("admin_login.html"))
 
 @app.post("/admin/login")
 async def admin_login(
     request: Request,
     username: str = Form(...),
     password: str = Form(...),
-    db: redis.Redis = Depends(get_redis)
+    db: aioredis.Redis = Depends(get_redis)
 ):
-    if verify_admin(username, password, db):
+    if await verify_admin(username, password, db):
+        # New id on privilege change to prevent session fixation
+        regenerate_session_id(request)
         request.session["admin_logged_in"] = True
         logger.info("Admin logged in successfully")
         return RedirectResponse(url="/admin", status_code=303)
     
     logger.warning("Failed admin login attempt")
-    return templates.TemplateResponse("admin_login.html", {
-        "request": request,
-        "error": "Invalid credentials"
-    }, status_code=401)
+    return HTMLResponse(render_page("admin_login.html", "Invalid credentials"), status_code=401)
 
 @app.get("/admin", response_class=HTMLResponse)
 async def admin_panel(request: Request):
     if not request.session.get("admin_logged_in"):
         return RedirectResponse(url="/admin/login", status_code=303)
     
-    return templates.TemplateResponse("admin.html", {"request": request})
+    return HTMLResponse(render_page("admin.html"))
 
 @app.post("/admin/broadcast")
 async def broadcast_message(
     request: Request,
+    background_tasks: BackgroundTasks,
     message: str = Form(...),
-    db: redis.Redis = Depends(get_redis)
+    db: aioredis.Redis = Depends(get_redis)
 ):
     if not request.session.get("admin_logged_in"):
         return RedirectResponse(url="/admin/login", status_code=303)
 
-    try:
-        users = []
-        for key in db.scan_iter("user:*"):
-            user = db.hgetall(key)
-            users.append({
-                "name": user.get("name"),
-                "email": user.get("email")
-            })
-
-        for user in users:
-            personalized_message = message.replace("{{Student_name}}", user["name"])
-            await send_email(
-                to=user["email"],
-                subject="New Announcement",
-                body=personalized_message
-            )
+    users = [orjson.loads(user) for user in await db.hvals("users:index")]
+    names = [user.get("name", "") for user in users]
+    emails = [user["email"] for user in users]
+
+    if emails:
+        background_tasks.add_task(deliver_broadcast, "New Announcement", message, names, emails)
 
-        logger.info(f"Broadcast message sent to {len(users)} users")
-        return templates.TemplateResponse("admin.html", {
-            "request": request,
-            "success": "Message broadcasted successfully"
-        })
-    except (redis.RedisError, AttributeError) as e:
-        logger.error(f"Broadcast error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to process broadcast")
+    logger.info(f"Broadcast message queued for {len(users)} users")
+    return templates.TemplateResponse("admin.html", {
+        "request": request,
+        "success": f"Message queued for {len(users)} users"
+    })
 
 @app.get("/logs", response_class=HTMLResponse)
 async def view_logs(request: Request):
@@ -258,19 +555,53 @@ async def view_logs(request: Request):
         return RedirectResponse(url="/admin/login", status_code=303)
     
     try:
-        with open("logs.txt", "r") as f:
-            logs = f.read()
-        return templates.TemplateResponse("logs.html", {
-            "request": request,
-            "logs": logs
-        })
+        size = os.path.getsize(LOG_FILE)
+        with open(LOG_FILE, "rb") as f:
+            f.seek(max(size - LOG_TAIL_BYTES, 0))
+            logs = f.read().decode("utf-8", "replace")
     except FileNotFoundError:
         logger.error("Log file not found")
         raise HTTPException(status_code=404, detail="Logs not available")
 
+    if size > LOG_TAIL_BYTES:
+        # Drop the partial first line
+        logs = logs.partition("\n")[2]
+    return templates.TemplateResponse("logs.html", {
+        "request": request,
+        "logs": logs
+    })
+
+@app.get("/logs/download")
+async def download_logs(request: Request):
+    if not request.session.get("admin_logged_in"):
+        return RedirectResponse(url="/admin/login", status_code=303)
+
+    try:
+        f = open(LOG_FILE, "rb")
+    except FileNotFoundError:
+        logger.error("Log file not found")
+        raise HTTPException(status_code=404, detail="Logs not available")
+    # The listener keeps appending, so send exactly the bytes present now
+    size = os.fstat(f.fileno()).st_size
+
+    def iter_log(chunk_size: int = 64 * 1024):
+        with f:
+            offset = 0
+            while offset < size:
+                chunk = os.pread(f.fileno(), min(chunk_size, size - offset), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                yield chunk
+
+    return StreamingResponse(iter_log(), media_type="text/plain", headers={
+        "Content-Length": str(size),
+        "Content-Disposition": 'attachment; filename="logs.txt"'
+    })
+
 @app.get("/success", response_class=HTMLResponse)
 async def success_page(request: Request):
-    return templates.TemplateResponse("success.html", {"request": request})
+    return HTMLResponse(render_page("success.html"))
 
 @app.post("/admin/logout")
 async def admin_logout(request: Request):